@@ -5,14 +5,63 @@ Demonstrates how to interact with the deployed serverless endpoint
 """
 
 import json
+import os
 import time
+import asyncio
 import base64
+import hashlib
+import random
+import tempfile
 import requests
-from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, Any, Iterator, List, Optional
 
+try:
+    import orjson  # Optional: faster parsing of status responses
+except ImportError:
+    orjson = None
 
-class RunPodClient:
-    """Client for interacting with RunPod Serverless API"""
+
+# Base64 characters decoded (or bytes streamed) per write in download_file;
+# must be a multiple of 4
+DOWNLOAD_CHUNK_CHARS = 64 * 1024
+
+
+def _parse(response, failure: str = "Request failed") -> Dict[str, Any]:
+    """Check an API response's status and parse its JSON body (requests or httpx)"""
+    if response.status_code != 200:
+        raise Exception(f"{failure}: {response.status_code} - {response.text}")
+    
+    # orjson parses noticeably faster when it is installed
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+def _poll_intervals(max_interval: float) -> Iterator[float]:
+    """Yield exponential backoff sleep intervals, with jitter so parallel waiters don't sync up"""
+    delay = 0.5
+    while True:
+        interval = min(delay, max_interval)
+        yield interval + random.uniform(0, 0.25 * interval)
+        delay *= 1.6
+
+
+def _job_output(status: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Return a finished job's output, None while it is still running; raise if it failed"""
+    job_status = status.get("status", "unknown")
+    print(f"📊 Status: {job_status}")
+    
+    if job_status == "COMPLETED":
+        return status.get("output", {})
+    elif job_status == "FAILED":
+        raise Exception(f"Job failed: {status}")
+    return None
+
+
+class _RunPodClientBase:
+    """Endpoint and auth settings shared by the sync and async clients"""
     
     def __init__(self, endpoint_id: str, api_key: str):
         self.endpoint_id = endpoint_id
@@ -22,6 +71,33 @@ class RunPodClient:
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
+
+
+class RunPodClient(_RunPodClientBase):
+    """Client for interacting with RunPod Serverless API"""
+    
+    def __init__(self, endpoint_id: str, api_key: str):
+        super().__init__(endpoint_id, api_key)
+        
+        # Reuse one pooled session so repeated calls skip the TCP/TLS handshake
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=10,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+        )
+        self.session.mount("https://", adapter)
+    
+    def close(self) -> None:
+        """Close the underlying HTTP session"""
+        self.session.close()
+    
+    def __enter__(self) -> "RunPodClient":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
     
     def submit_sync_request(self, task_config: Dict[str, Any]) -> Dict[str, Any]:
         """Submit a synchronous request (waits for completion)"""
@@ -34,12 +110,8 @@ class RunPodClient:
         print(f"🚀 Submitting sync request to {url}")
         print(f"📋 Payload: {json.dumps(payload, indent=2)}")
         
-        response = requests.post(url, headers=self.headers, json=payload)
-        
-        if response.status_code != 200:
-            raise Exception(f"Request failed: {response.status_code} - {response.text}")
-        
-        return response.json()
+        response = self.session.post(url, json=payload)
+        return _parse(response)
     
     def submit_async_request(self, task_config: Dict[str, Any]) -> str:
         """Submit an asynchronous request (returns job ID)"""
@@ -50,58 +122,165 @@ class RunPodClient:
         }
         
         print(f"🚀 Submitting async request to {url}")
-        response = requests.post(url, headers=self.headers, json=payload)
+        response = self.session.post(url, json=payload)
+        return _parse(response)["id"]
+    
+    def submit_batch(self, task_configs: List[Dict[str, Any]]) -> str:
+        """Submit several task configs as a single asynchronous job (returns job ID)"""
+        url = f"{self.base_url}/run"
         
-        if response.status_code != 200:
-            raise Exception(f"Request failed: {response.status_code} - {response.text}")
+        payload = {
+            "input": {"batch": task_configs}
+        }
         
-        result = response.json()
-        return result["id"]
+        print(f"🚀 Submitting batch of {len(task_configs)} tasks to {url}")
+        response = self.session.post(url, json=payload)
+        return _parse(response)["id"]
     
     def check_status(self, job_id: str) -> Dict[str, Any]:
         """Check status of an async job"""
         url = f"{self.base_url}/status/{job_id}"
         
-        response = requests.get(url, headers=self.headers)
-        
-        if response.status_code != 200:
-            raise Exception(f"Status check failed: {response.status_code} - {response.text}")
-        
-        return response.json()
+        response = self.session.get(url)
+        return _parse(response, "Status check failed")
     
-    def wait_for_completion(self, job_id: str, max_wait: int = 300) -> Dict[str, Any]:
-        """Wait for async job to complete"""
+    def wait_for_completion(self, job_id: str, max_wait: int = 300,
+                            max_interval: float = 8.0) -> Dict[str, Any]:
+        """Wait for async job to complete, polling with exponential backoff"""
         print(f"⏳ Waiting for job {job_id} to complete...")
         
-        start_time = time.time()
+        intervals = _poll_intervals(max_interval)
+        deadline = time.time() + max_wait
         
-        while time.time() - start_time < max_wait:
-            status = self.check_status(job_id)
-            
-            job_status = status.get("status", "unknown")
-            print(f"📊 Status: {job_status}")
-            
-            if job_status == "COMPLETED":
-                return status.get("output", {})
-            elif job_status == "FAILED":
-                raise Exception(f"Job failed: {status}")
+        while time.time() < deadline:
+            output = _job_output(self.check_status(job_id))
+            if output is not None:
+                return output
             
-            time.sleep(5)  # Poll every 5 seconds
+            time.sleep(next(intervals))
         
         raise Exception(f"Job timed out after {max_wait} seconds")
     
     def download_file(self, file_info: Dict[str, Any], save_path: str) -> None:
-        """Download file from base64 content"""
+        """Download file from a presigned URL or from inline base64 content"""
+        if file_info.get("url"):
+            self._download_url(file_info, save_path)
+            return
+        
         content_base64 = file_info.get("content_base64")
         if not content_base64:
-            raise ValueError("No base64 content found in file info")
-        
-        content_bytes = base64.b64decode(content_base64)
+            raise ValueError("No base64 content or URL found in file info")
         
+        # Strip line-wrapping first so every slice stays 4-aligned, then decode
+        # in chunks so the full decoded file is never held in memory
+        content_base64 = "".join(content_base64.split())
+        size_bytes = 0
         with open(save_path, "wb") as f:
-            f.write(content_bytes)
+            for start in range(0, len(content_base64), DOWNLOAD_CHUNK_CHARS):
+                chunk = base64.b64decode(content_base64[start:start + DOWNLOAD_CHUNK_CHARS])
+                f.write(chunk)
+                size_bytes += len(chunk)
+        
+        print(f"💾 Saved file: {save_path} ({size_bytes} bytes)")
+    
+    def _download_url(self, file_info: Dict[str, Any], save_path: str) -> None:
+        """Stream a file from its presigned URL to disk, verifying the checksum"""
+        digest = hashlib.sha256()
+        size_bytes = 0
         
-        print(f"💾 Saved file: {save_path} ({len(content_bytes)} bytes)")
+        # The presigned URL carries its own auth; don't send the API key to storage
+        with self.session.get(file_info["url"], stream=True,
+                              headers={"Authorization": None}) as response:
+            if response.status_code != 200:
+                raise Exception(f"Download failed: {response.status_code} - {response.text}")
+            
+            # Stream to a temp file beside save_path and only move it into
+            # place once the checksum matches
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(save_path)))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_CHARS):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size_bytes += len(chunk)
+                
+                expected = file_info.get("sha256")
+                if expected and digest.hexdigest() != expected:
+                    raise ValueError(f"Checksum mismatch for {save_path}")
+                
+                os.replace(tmp_path, save_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        
+        print(f"💾 Saved file: {save_path} ({size_bytes} bytes)")
+
+
+class AsyncRunPodClient(_RunPodClientBase):
+    """
+    Asyncio client for RunPod Serverless API
+    
+    Uses a single HTTP/2 connection so many jobs can be submitted and polled
+    concurrently as multiplexed streams instead of separate TCP connections.
+    """
+    
+    def __init__(self, endpoint_id: str, api_key: str, max_keepalive_connections: int = 20):
+        super().__init__(endpoint_id, api_key)
+        
+        # Imported lazily so the sync client and local demo work without httpx
+        import httpx
+        
+        self.client = httpx.AsyncClient(
+            http2=True,
+            headers=self.headers,
+            limits=httpx.Limits(max_keepalive_connections=max_keepalive_connections)
+        )
+    
+    async def close(self) -> None:
+        """Close the underlying HTTP client"""
+        await self.client.aclose()
+    
+    async def __aenter__(self) -> "AsyncRunPodClient":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+    
+    async def submit_async_request(self, task_config: Dict[str, Any]) -> str:
+        """Submit an asynchronous request (returns job ID)"""
+        url = f"{self.base_url}/run"
+        
+        payload = {
+            "input": task_config
+        }
+        
+        print(f"🚀 Submitting async request to {url}")
+        response = await self.client.post(url, json=payload)
+        return _parse(response)["id"]
+    
+    async def check_status(self, job_id: str) -> Dict[str, Any]:
+        """Check status of an async job"""
+        url = f"{self.base_url}/status/{job_id}"
+        
+        response = await self.client.get(url)
+        return _parse(response, "Status check failed")
+    
+    async def wait_for_completion(self, job_id: str, max_wait: int = 300,
+                                  max_interval: float = 8.0) -> Dict[str, Any]:
+        """Wait for async job to complete, polling with exponential backoff"""
+        print(f"⏳ Waiting for job {job_id} to complete...")
+        
+        intervals = _poll_intervals(max_interval)
+        deadline = time.time() + max_wait
+        
+        while time.time() < deadline:
+            output = _job_output(await self.check_status(job_id))
+            if output is not None:
+                return output
+            
+            await asyncio.sleep(next(intervals))
+        
+        raise Exception(f"Job timed out after {max_wait} seconds")
 
 
 def demo_sync_requests():
@@ -184,48 +363,94 @@ def demo_async_requests():
     print("⚡ ASYNCHRONOUS REQUEST DEMO")
     print("=" * 60)
     
-    client = RunPodClient(
+    asyncio.run(_run_async_requests())
+
+
+async def _run_async_requests():
+    """Submit several jobs and poll them concurrently over one HTTP/2 connection"""
+    async with AsyncRunPodClient(
         endpoint_id="YOUR_ENDPOINT_ID",
         api_key="YOUR_API_KEY" 
-    )
+    ) as client:
+        configs = [
+            {
+                "task_type": "text_processing",
+                "duration": duration,
+                "user_input": f"Long running task #{i+1} - {duration} seconds"
+            }
+            for i, duration in enumerate([10, 25, 35])
+        ]
+        
+        # Submit multiple jobs at once
+        print(f"\n🚀 Submitting {len(configs)} jobs")
+        job_ids = await asyncio.gather(*[client.submit_async_request(c) for c in configs])
+        jobs = [
+            {
+                "id": job_id,
+                "duration": config["duration"],
+                "name": f"Job {i+1}"
+            }
+            for i, (job_id, config) in enumerate(zip(job_ids, configs))
+        ]
+        for job in jobs:
+            print(f"📋 {job['name']} ID: {job['id']} (duration: {job['duration']}s)")
+        
+        print(f"\n⏳ Waiting for {len(jobs)} jobs to complete...")
+        
+        # Wait for all jobs concurrently - wall time is the slowest job, not the sum
+        results = await asyncio.gather(
+            *[client.wait_for_completion(job['id']) for job in jobs],
+            return_exceptions=True
+        )
+        
+        for job, result in zip(jobs, results):
+            print(f"\n📊 Checking {job['name']} ({job['id']})")
+            
+            if isinstance(result, Exception):
+                print(f"💥 {job['name']} exception: {str(result)}")
+            elif result.get('success'):
+                print(f"✅ {job['name']} completed!")
+                file_info = result['result']['result']
+                print(f"📄 File: {file_info['filename']}")
+            else:
+                print(f"❌ {job['name']} failed: {result.get('error')}")
+
+
+def demo_batch_requests():
+    """Demo batch requests - several tasks submitted in one request"""
+    print("=" * 60)
+    print("📦 BATCH REQUEST DEMO")
+    print("=" * 60)
     
-    # Submit multiple jobs at once
-    jobs = []
+    client = RunPodClient(
+        endpoint_id="YOUR_ENDPOINT_ID",
+        api_key="YOUR_API_KEY"
+    )
     
-    for i, duration in enumerate([10, 25, 35]):
-        config = {
+    configs = [
+        {
             "task_type": "text_processing",
             "duration": duration,
-            "user_input": f"Long running task #{i+1} - {duration} seconds"
+            "user_input": f"Batched task #{i+1} - {duration} seconds"
         }
-        
-        print(f"\n🚀 Submitting job {i+1} (duration: {duration}s)")
-        job_id = client.submit_async_request(config)
-        jobs.append({
-            "id": job_id,
-            "duration": duration,
-            "name": f"Job {i+1}"
-        })
-        print(f"📋 Job ID: {job_id}")
-    
-    print(f"\n⏳ Waiting for {len(jobs)} jobs to complete...")
+        for i, duration in enumerate([10, 25, 35])
+    ]
     
-    # Wait for all jobs
-    for job in jobs:
-        print(f"\n📊 Checking {job['name']} ({job['id']})")
+    try:
+        job_id = client.submit_batch(configs)
+        print(f"📋 Batch Job ID: {job_id}")
         
-        try:
-            result = client.wait_for_completion(job['id'])
-            
+        output = client.wait_for_completion(job_id)
+        
+        for i, result in enumerate(output.get('results', [])):
             if result.get('success'):
-                print(f"✅ {job['name']} completed!")
-                file_info = result['result']['result']
-                print(f"📄 File: {file_info['filename']}")
+                print(f"✅ Task {i+1} completed!")
+                print(f"📄 File: {result['result']['result']['filename']}")
             else:
-                print(f"❌ {job['name']} failed: {result.get('error')}")
+                print(f"❌ Task {i+1} failed: {result.get('error')}")
                 
-        except Exception as e:
-            print(f"💥 {job['name']} exception: {str(e)}")
+    except Exception as e:
+        print(f"💥 Batch exception: {str(e)}")
 
 
 def demo_local_test():
@@ -279,6 +504,7 @@ if __name__ == "__main__":
         print("🔐 Found credentials, running live demos...")
         demo_sync_requests()
         demo_async_requests()
+        demo_batch_requests()
     else:
         print("⚠️  No credentials found (RUNPOD_ENDPOINT_ID, RUNPOD_API_KEY)")
         print("📋 Running local demo instead...")
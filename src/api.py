@@ -5,69 +5,137 @@ Simulates 5-45 second processing with progress updates and file output
 
 import time
 import json
-import base64
+import math
+import hashlib
+import msgspec
+import pybase64
 import uuid
 import os
 from io import StringIO
-from typing import Dict, Any, Generator, Optional
+from itertools import accumulate
+from typing import Dict, Any, Final, Generator, Optional, Union
+
+
+# Realistic processing steps per task type, shared across all processors
+_BASE_STEPS = (
+    "Initializing environment",
+    "Loading configuration",
+    "Validating input data",
+)
+
+_FINAL_STEPS = (
+    "Finalizing results",
+    "Preparing output file",
+    "Cleanup and completion",
+)
+
+_STEPS_BY_TYPE = {
+    'text_processing': _BASE_STEPS + (
+        "Tokenizing text",
+        "Running language model",
+        "Processing embeddings",
+        "Generating response",
+        "Formatting output",
+    ) + _FINAL_STEPS,
+    'image_generation': _BASE_STEPS + (
+        "Loading diffusion model",
+        "Encoding prompt",
+        "Running diffusion steps",
+        "Decoding latents",
+        "Post-processing image",
+    ) + _FINAL_STEPS,
+    'data_analysis': _BASE_STEPS + (
+        "Loading dataset",
+        "Feature engineering",
+        "Running analysis",
+        "Computing statistics",
+        "Generating report",
+    ) + _FINAL_STEPS,
+}
+
+_TASK_TYPES = ('text_processing', 'image_generation', 'data_analysis')
+_VALID_TYPES = frozenset(_TASK_TYPES)
+
+# Mock image data (1x1 PNG), encoded once at import
+_FAKE_PNG: Final[bytes] = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\nIDATx\x9cc\x00\x01\x00\x00\x05\x00\x01\r\n-\xdb\x00\x00\x00\x00IEND\xaeB`\x82'
+_FAKE_PNG_B64: Final[str] = pybase64.b64encode_as_string(_FAKE_PNG)
+
+# Result file templates, filled per task with str.format_map
+_MD_TEMPLATE: Final[str] = """# Text Processing Results - Task {task_id}
+
+## Input Configuration
+- Duration: {duration} seconds
+- Task Type: {task_type}
+- Processing Steps: {step_count}
+
+## Processing Summary
+Successfully processed input text using advanced language model.
+
+## Generated Output
+Lorem ipsum dolor sit amet, consectetur adipiscing elit. 
+Sed do eiusmod tempor incididunt ut labore et dolore magna aliqua.
+Ut enim ad minim veniam, quis nostrud exercitation ullamco.
+
+## Statistics
+- Tokens processed: 1,247
+- Model confidence: 94.7%
+- Processing time: {duration:.2f}s
+
+## Metadata
+Generated on: {now}
+Task ID: {task_id}"""
+
+_CSV_TEMPLATE: Final[str] = """timestamp,metric,value,category
+{now},accuracy,0.947,model_performance
+{now},precision,0.923,model_performance  
+{now},recall,0.891,model_performance
+{now},f1_score,0.906,model_performance
+{now},processing_time,{duration:.2f},timing
+{now},memory_usage,2.1,resources"""
+
+
+# Environment variables rp_upload needs to create a bucket client
+_BUCKET_ENV_VARS = ('BUCKET_ENDPOINT_URL', 'BUCKET_ACCESS_KEY_ID', 'BUCKET_SECRET_ACCESS_KEY')
+
+
+class UploadError(Exception):
+    """Raised when a result file cannot be uploaded to bucket storage"""
+
+
+def bucket_configured() -> bool:
+    """Check that bucket credentials are set, so output_format 'url' can upload"""
+    return all(os.environ.get(name) for name in _BUCKET_ENV_VARS)
+
+
+class TaskConfig(msgspec.Struct):
+    """Validated task configuration extracted from a request's input"""
+    task_type: str = 'text_processing'
+    duration: Union[int, float] = 20  # Seconds, clamped to 5-45 by validate_request
+    output_format: str = 'base64'
+    user_input: str = 'Default test input'
 
 
 class MockProcessor:
     """Simulates a long-running AI/ML process with progress tracking"""
     
-    def __init__(self, task_config: Dict[str, Any]):
-        self.task_id = str(uuid.uuid4())
+    def __init__(self, task_config: TaskConfig):
+        self.task_id = uuid.uuid4().hex
         self.task_config = task_config
-        self.duration = task_config.get('duration', 20)  # Default 20 seconds
-        self.output_format = task_config.get('output_format', 'text')
+        self.duration = task_config.duration
+        self.output_format = task_config.output_format
         self.progress = 0
         self.status = 'pending'
         self.result = None
         
         # Simulate different task types
-        self.task_type = task_config.get('task_type', 'text_processing')
-        self.steps = self._generate_processing_steps()
-    
-    def _generate_processing_steps(self) -> list:
-        """Generate realistic processing steps based on task type"""
-        base_steps = [
-            "Initializing environment",
-            "Loading configuration", 
-            "Validating input data",
-        ]
+        self.task_type = task_config.task_type
+        self.steps = _STEPS_BY_TYPE.get(self.task_type, _BASE_STEPS + _FINAL_STEPS)
         
-        if self.task_type == 'text_processing':
-            base_steps.extend([
-                "Tokenizing text",
-                "Running language model",
-                "Processing embeddings",
-                "Generating response",
-                "Formatting output"
-            ])
-        elif self.task_type == 'image_generation':
-            base_steps.extend([
-                "Loading diffusion model",
-                "Encoding prompt",
-                "Running diffusion steps", 
-                "Decoding latents",
-                "Post-processing image"
-            ])
-        elif self.task_type == 'data_analysis':
-            base_steps.extend([
-                "Loading dataset",
-                "Feature engineering",
-                "Running analysis",
-                "Computing statistics",
-                "Generating report"
-            ])
-        
-        base_steps.extend([
-            "Finalizing results",
-            "Preparing output file",
-            "Cleanup and completion"
-        ])
-        
-        return base_steps
+        # Model loading steps take longer than the rest
+        self._slow_step = [
+            'model' in step.lower() or 'diffusion' in step.lower()
+            for step in self.steps
+        ]
     
     def process(self) -> Generator[Dict[str, Any], None, Dict[str, Any]]:
         """
@@ -76,26 +144,26 @@ class MockProcessor:
         """
         self.status = 'running'
         total_steps = len(self.steps)
-        step_duration = self.duration / total_steps
         
+        # Simulate variable step duration (model loading takes longer), scaled
+        # so the whole task takes self.duration seconds
+        weights = [2.0 if slow else 0.8 for slow in self._slow_step]
+        scale = self.duration / sum(weights)
+        schedule = list(accumulate(weight * scale for weight in weights))
+        
+        start = time.monotonic()
         for i, step in enumerate(self.steps):
-            # Simulate variable step duration (some steps take longer)
-            if 'model' in step.lower() or 'diffusion' in step.lower():
-                time.sleep(step_duration * 2)  # Model loading takes longer
-            else:
-                time.sleep(step_duration * 0.8)
+            # Sleep until this step's target end time rather than a fixed amount
+            time.sleep(max(0.0, start + schedule[i] - time.monotonic()))
             
             self.progress = int((i + 1) / total_steps * 100)
             
-            # Yield progress update
+            # Yield progress update (task_id/total_steps live on the response)
             yield {
-                'task_id': self.task_id,
-                'status': 'processing',
                 'progress': self.progress,
                 'current_step': step,
                 'step': i + 1,
-                'total_steps': total_steps,
-                'elapsed_time': (i + 1) * step_duration
+                'elapsed_time': time.monotonic() - start
             }
         
         # Generate final result and file
@@ -113,84 +181,97 @@ class MockProcessor:
     
     def _generate_result_file(self) -> Dict[str, Any]:
         """Generate mock result file based on task type"""
+        now = time.strftime('%Y-%m-%d %H:%M:%S')
         
         if self.task_type == 'text_processing':
             # Generate a mock text processing result
-            content = f"""
-# Text Processing Results - Task {self.task_id}
-
-## Input Configuration
-- Duration: {self.duration} seconds
-- Task Type: {self.task_type}
-- Processing Steps: {len(self.steps)}
-
-## Processing Summary
-Successfully processed input text using advanced language model.
-
-## Generated Output
-Lorem ipsum dolor sit amet, consectetur adipiscing elit. 
-Sed do eiusmod tempor incididunt ut labore et dolore magna aliqua.
-Ut enim ad minim veniam, quis nostrud exercitation ullamco.
-
-## Statistics
-- Tokens processed: 1,247
-- Model confidence: 94.7%
-- Processing time: {self.duration:.2f}s
-
-## Metadata
-Generated on: {time.strftime('%Y-%m-%d %H:%M:%S')}
-Task ID: {self.task_id}
-            """.strip()
+            content = _MD_TEMPLATE.format_map({
+                'task_id': self.task_id,
+                'duration': self.duration,
+                'task_type': self.task_type,
+                'step_count': len(self.steps),
+                'now': now,
+            })
+            
+            content_bytes = content.encode('utf-8')
+            filename = f'text_result_{self.task_id[:8]}.md'
             
             return {
-                'filename': f'text_result_{self.task_id[:8]}.md',
+                'filename': filename,
                 'content_type': 'text/markdown',
-                'size_bytes': len(content.encode()),
-                'content_base64': base64.b64encode(content.encode()).decode(),
+                'size_bytes': len(content_bytes),
+                **self._file_content(filename, content_bytes),
                 'preview': content[:200] + '...' if len(content) > 200 else content
             }
             
         elif self.task_type == 'image_generation':
-            # Mock image data (1x1 PNG)
-            fake_png = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\nIDATx\x9cc\x00\x01\x00\x00\x05\x00\x01\r\n-\xdb\x00\x00\x00\x00IEND\xaeB`\x82'
+            filename = f'generated_image_{self.task_id[:8]}.png'
             
             return {
-                'filename': f'generated_image_{self.task_id[:8]}.png',
+                'filename': filename,
                 'content_type': 'image/png', 
-                'size_bytes': len(fake_png),
-                'content_base64': base64.b64encode(fake_png).decode(),
+                'size_bytes': len(_FAKE_PNG),
+                **self._file_content(filename, _FAKE_PNG, _FAKE_PNG_B64),
                 'preview': f'Generated {1024}x{1024} image with prompt from task {self.task_id[:8]}'
             }
             
         elif self.task_type == 'data_analysis':
             # Mock CSV data
-            csv_content = f"""timestamp,metric,value,category
-{time.strftime('%Y-%m-%d %H:%M:%S')},accuracy,0.947,model_performance
-{time.strftime('%Y-%m-%d %H:%M:%S')},precision,0.923,model_performance  
-{time.strftime('%Y-%m-%d %H:%M:%S')},recall,0.891,model_performance
-{time.strftime('%Y-%m-%d %H:%M:%S')},f1_score,0.906,model_performance
-{time.strftime('%Y-%m-%d %H:%M:%S')},processing_time,{self.duration:.2f},timing
-{time.strftime('%Y-%m-%d %H:%M:%S')},memory_usage,2.1,resources"""
+            csv_content = _CSV_TEMPLATE.format_map({'duration': self.duration, 'now': now})
+            
+            csv_bytes = csv_content.encode('utf-8')
+            filename = f'analysis_results_{self.task_id[:8]}.csv'
             
             return {
-                'filename': f'analysis_results_{self.task_id[:8]}.csv',
+                'filename': filename,
                 'content_type': 'text/csv',
-                'size_bytes': len(csv_content.encode()),
-                'content_base64': base64.b64encode(csv_content.encode()).decode(),
+                'size_bytes': len(csv_bytes),
+                **self._file_content(filename, csv_bytes),
                 'preview': 'Analysis complete. CSV contains 6 metrics including performance and resource usage.'
             }
         
         # Default fallback
+        filename = f'result_{self.task_id[:8]}.txt'
+        
         return {
-            'filename': f'result_{self.task_id[:8]}.txt',
+            'filename': filename,
             'content_type': 'text/plain',
             'size_bytes': 50,
-            'content_base64': base64.b64encode(f'Task {self.task_id} completed successfully!'.encode()).decode(),
+            **self._file_content(filename, f'Task {self.task_id} completed successfully!'.encode()),
             'preview': 'Basic task completion result'
         }
+    
+    def _file_content(self, filename: str, content_bytes: bytes,
+                      content_base64: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Return the file body either inline as base64 or, for output_format 'url',
+        as a presigned URL to a copy uploaded to bucket storage
+        """
+        if self.output_format == 'url' and bucket_configured():
+            # Imported lazily: boto3 is only needed when uploading
+            from runpod.serverless.utils import rp_upload
+            
+            try:
+                url = rp_upload.upload_in_memory_object(
+                    filename,
+                    content_bytes,
+                    bucket_name=os.environ.get('BUCKET_NAME'),
+                    prefix=self.task_id
+                )
+            except Exception as e:
+                raise UploadError(f"Failed to upload {filename} to bucket storage: {e}") from e
+            return {
+                'url': url,
+                'sha256': hashlib.sha256(content_bytes).hexdigest()
+            }
+        
+        # Default: inline base64 (also used when no bucket is configured)
+        if content_base64 is None:
+            content_base64 = pybase64.b64encode_as_string(content_bytes)
+        return {'content_base64': content_base64}
 
 
-def validate_request(event: Dict[str, Any]) -> Dict[str, Any]:
+def validate_request(event: Dict[str, Any]) -> TaskConfig:
     """Validate incoming request and extract configuration"""
     input_data = event.get('input', {})
     
@@ -198,17 +279,19 @@ def validate_request(event: Dict[str, Any]) -> Dict[str, Any]:
     if not isinstance(input_data, dict):
         raise ValueError("Input must be a dictionary")
     
-    # Extract and validate configuration
-    config = {
-        'task_type': input_data.get('task_type', 'text_processing'),
-        'duration': min(max(input_data.get('duration', 20), 5), 45),  # Clamp 5-45 seconds
-        'output_format': input_data.get('output_format', 'base64'),
-        'user_input': input_data.get('user_input', 'Default test input'),
-    }
+    # Extract and type-check configuration in a single pass
+    try:
+        config = msgspec.convert(input_data, TaskConfig)
+    except msgspec.ValidationError as e:
+        raise ValueError(str(e)) from e
+    
+    if not math.isfinite(config.duration):
+        raise ValueError("duration must be a finite number")
+    
+    config.duration = min(max(config.duration, 5), 45)  # Clamp 5-45 seconds
     
     # Validate task type
-    valid_types = ['text_processing', 'image_generation', 'data_analysis']
-    if config['task_type'] not in valid_types:
-        raise ValueError(f"task_type must be one of: {valid_types}")
+    if config.task_type not in _VALID_TYPES:
+        raise ValueError(f"task_type must be one of: {list(_TASK_TYPES)}")
     
     return config
\ No newline at end of file
@@ -9,13 +9,22 @@ import asyncio
 import logging
 import sys
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional
-from src.api import MockProcessor, validate_request
+from src.api import MockProcessor, UploadError, validate_request
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Upper bounds on tasks per batch job and on those processed concurrently
+MAX_BATCH_SIZE = 16
+MAX_BATCH_WORKERS = 8
+
+# Number of most recent progress updates kept in the response
+MAX_PROGRESS_UPDATES = 16
+
 
 def handler(event: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -24,43 +33,67 @@ def handler(event: Dict[str, Any]) -> Dict[str, Any]:
     Handles incoming requests and manages the long-running process
     with progress updates and file generation.
     """
+    input_data = event.get('input', {})
+    logger.info(
+        "Received request id=%s task_type=%s",
+        event.get('id'),
+        input_data.get('task_type') if isinstance(input_data, dict) else None
+    )
+    
+    # Batch submissions carry a list of task configs under input.batch
+    if isinstance(input_data, dict) and isinstance(input_data.get('batch'), list):
+        return handle_batch(event)
+    
+    return process_task(event)
+
+
+def process_task(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate and run a single task, returning its response"""
     try:
-        logger.info(f"Received request: {json.dumps(event, indent=2)}")
-        
         # Validate input
         config = validate_request(event)
-        logger.info(f"Validated config: {config}")
+        logger.info("Validated config: %s", config)
         
         # Initialize processor
         processor = MockProcessor(config)
         logger.info(f"Initialized processor for task: {processor.task_id}")
         
-        # Track progress updates for return
-        progress_updates = []
+        # Track the most recent progress updates for return
+        progress_updates = deque(maxlen=MAX_PROGRESS_UPDATES)
         final_result = None
         
         # Process with progress tracking
         logger.info("Starting processing...")
-        for progress_update in processor.process():
+        next_milestone = 20
+        progress = processor.process()
+        while True:
+            try:
+                progress_update = next(progress)
+            except StopIteration as stop:
+                # The generator's return value is the complete result
+                final_result = stop.value
+                break
+            
             progress_updates.append(progress_update)
             
-            # Log significant milestones
-            if progress_update.get('progress', 0) % 20 == 0:
-                logger.info(f"Progress: {progress_update['progress']}% - {progress_update.get('current_step', 'Unknown')}")
+            # Log each 20% milestone once, even if a step jumps past it
+            if progress_update['progress'] >= next_milestone:
+                logger.info("Progress: %d%% - %s", progress_update['progress'],
+                            progress_update.get('current_step', 'Unknown'))
+                while next_milestone <= progress_update['progress']:
+                    next_milestone += 20
         
-        # The final iteration returns the complete result
-        final_result = progress_update
         logger.info(f"Processing completed for task: {processor.task_id}")
         
         # Prepare response with all progress data + final result
         response = {
             'success': True,
             'task_id': processor.task_id,
-            'task_type': config['task_type'],
-            'duration_seconds': config['duration'],
-            'progress_updates': progress_updates[:-1],  # Exclude final result from progress
+            'task_type': config.task_type,
+            'duration_seconds': config.duration,
+            'progress_updates': list(progress_updates),
             'result': final_result,
-            'total_steps': len(progress_updates),
+            'total_steps': len(processor.steps),
             'metadata': {
                 'runpod_request_id': event.get('id', 'unknown'),
                 'processing_complete': True,
@@ -72,12 +105,15 @@ def handler(event: Dict[str, Any]) -> Dict[str, Any]:
         return response
         
     except ValueError as e:
-        logger.error(f"Validation error: {str(e)}")
+        return _validation_error(e)
+        
+    except UploadError as e:
+        logger.error(f"Upload error: {str(e)}")
         return {
             'success': False,
-            'error': 'validation_error',
+            'error': 'upload_error',
             'message': str(e),
-            'task_id': None
+            'task_id': processor.task_id
         }
         
     except Exception as e:
@@ -90,25 +126,75 @@ def handler(event: Dict[str, Any]) -> Dict[str, Any]:
         }
 
 
-def health_check() -> Dict[str, Any]:
-    """Health check endpoint for RunPod"""
+def _validation_error(error: ValueError) -> Dict[str, Any]:
+    """Build the response for a request that failed validation"""
+    logger.error(f"Validation error: {str(error)}")
     return {
-        'status': 'healthy',
-        'service': 'runpod-test-api',
-        'version': '1.0.0',
-        'capabilities': [
-            'text_processing',
-            'image_generation', 
-            'data_analysis'
-        ],
-        'limits': {
-            'min_duration': 5,
-            'max_duration': 45,
-            'supported_formats': ['base64', 'url']
+        'success': False,
+        'error': 'validation_error',
+        'message': str(error),
+        'task_id': None
+    }
+
+
+def handle_batch(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Process a batch of task configs submitted as one job
+    
+    Each config is run as a single task in a thread pool, so a single
+    /run request can carry several tasks. Batches cannot be nested.
+    """
+    batch = event['input']['batch']
+    if not batch:
+        return _validation_error(ValueError("batch must contain at least one task config"))
+    if len(batch) > MAX_BATCH_SIZE:
+        return _validation_error(ValueError(f"batch must contain at most {MAX_BATCH_SIZE} task configs"))
+    if any(isinstance(task_config, dict) and 'batch' in task_config for task_config in batch):
+        return _validation_error(ValueError("batch task configs cannot contain a nested batch"))
+    
+    request_id = event.get('id', 'unknown')
+    logger.info(f"Processing batch of {len(batch)} tasks")
+    
+    with ThreadPoolExecutor(max_workers=min(len(batch), MAX_BATCH_WORKERS)) as executor:
+        results = list(executor.map(
+            lambda task_config: process_task({'input': task_config, 'id': request_id}),
+            batch
+        ))
+    
+    return {
+        'success': all(result['success'] for result in results),
+        'batch_size': len(batch),
+        'results': results,
+        'metadata': {
+            'runpod_request_id': request_id,
+            'processing_complete': True
         }
     }
 
 
+# Static health check payload, built once at import
+_HEALTH = {
+    'status': 'healthy',
+    'service': 'runpod-test-api',
+    'version': '1.0.0',
+    'capabilities': [
+        'text_processing',
+        'image_generation', 
+        'data_analysis'
+    ],
+    'limits': {
+        'min_duration': 5,
+        'max_duration': 45,
+        'supported_formats': ['base64', 'url']
+    }
+}
+
+
+def health_check() -> Dict[str, Any]:
+    """Health check endpoint for RunPod (returns a shared dict; do not mutate)"""
+    return _HEALTH
+
+
 # Advanced handler with webhook support (for production use)
 def handler_with_webhook(event: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -116,10 +202,16 @@ def handler_with_webhook(event: Dict[str, Any]) -> Dict[str, Any]:
     This would be used in production for truly async processing
     """
     try:
-        config = validate_request(event)
         webhook_url = event.get('webhook', {}).get('url')
         
         if webhook_url:
+            # Webhook mode queues a single task; batches go through handler()
+            input_data = event.get('input', {})
+            if isinstance(input_data, dict) and 'batch' in input_data:
+                return _validation_error(ValueError("batch submissions are not supported in webhook mode"))
+            
+            config = validate_request(event)
+            
             # For webhook mode, return immediately and process async
             processor = MockProcessor(config)
             
@@ -135,7 +227,7 @@ def handler_with_webhook(event: Dict[str, Any]) -> Dict[str, Any]:
                 'status': 'accepted',
                 'message': 'Task queued for processing. Progress updates will be sent to webhook.',
                 'webhook_url': webhook_url,
-                'estimated_duration': config['duration']
+                'estimated_duration': config.duration
             }
         else:
             # Fallback to synchronous processing
@@ -3,88 +3,208 @@ Utility functions for RunPod test application
 """
 
 import os
-import json
 import time
 import logging
-from typing import Dict, Any, Optional
-import base64
+from functools import lru_cache
+from typing import Dict, Any, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+import binascii
+import hashlib
+
+
+# Strips whitespace from line-wrapped base64 in a single pass
+_WHITESPACE_TABLE = str.maketrans('', '', ' \t\r\n')
+
+# Replaces characters that are invalid in filenames with '_'
+_SANITIZE_TABLE = str.maketrans({char: '_' for char in '<>:"/\\|?*'})
+
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+# Characters of text encoded and hashed at a time in generate_file_metadata
+_METADATA_CHUNK_CHARS = 64 * 1024
+
+# Fixed-shape response skeletons, copied and filled per response
+_ERROR_TEMPLATE = {'success': False, 'error': None, 'message': None, 'task_id': None, 'timestamp': None}
+_SUCCESS_TEMPLATE = {'success': True, 'task_id': None, 'timestamp': None}
+
+
+# (epoch second, formatted timestamp) for the most recent _timestamp() call
+_timestamp_cache = (0, '')
+
+
+def _timestamp(when: Optional[float] = None) -> str:
+    """Return local time (default: now) formatted, reformatting once per wall-clock second"""
+    global _timestamp_cache
+    second = int(time.time() if when is None else when)
+    if second != _timestamp_cache[0]:
+        _timestamp_cache = (second, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(second)))
+    return _timestamp_cache[1]
+
+
+class _CachedTimeFormatter(logging.Formatter):
+    """Log formatter that reuses the per-second timestamp cache for %(asctime)s"""
+    
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        return _timestamp(record.created)
 
 
 def setup_logging(level: str = "INFO") -> None:
     """Configure logging for the application"""
+    handler = logging.StreamHandler()
+    handler.setFormatter(_CachedTimeFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
     logging.basicConfig(
         level=getattr(logging, level.upper()),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
+        handlers=[handler]
     )
 
 
-def get_environment_config() -> Dict[str, Any]:
-    """Get configuration from environment variables"""
-    return {
-        'runpod_api_key': os.environ.get('RUNPOD_API_KEY'),
-        'runpod_endpoint_id': os.environ.get('RUNPOD_ENDPOINT_ID'),
-        'webhook_secret': os.environ.get('WEBHOOK_SECRET'),
-        'max_processing_time': int(os.environ.get('MAX_PROCESSING_TIME', '45')),
-        'default_task_type': os.environ.get('DEFAULT_TASK_TYPE', 'text_processing'),
-        'debug_mode': os.environ.get('DEBUG', 'false').lower() == 'true'
-    }
+class EnvConfig(NamedTuple):
+    """Configuration read from environment variables"""
+    runpod_api_key: Optional[str]
+    runpod_endpoint_id: Optional[str]
+    webhook_secret: Optional[str]
+    max_processing_time: int
+    default_task_type: str
+    debug_mode: bool
+
+
+@lru_cache(maxsize=1)
+def get_environment_config() -> EnvConfig:
+    """
+    Get configuration from environment variables
+    
+    Read once per process and cached; the returned tuple is immutable.
+    """
+    return EnvConfig(
+        runpod_api_key=os.environ.get('RUNPOD_API_KEY'),
+        runpod_endpoint_id=os.environ.get('RUNPOD_ENDPOINT_ID'),
+        webhook_secret=os.environ.get('WEBHOOK_SECRET'),
+        max_processing_time=int(os.environ.get('MAX_PROCESSING_TIME', '45')),
+        default_task_type=os.environ.get('DEFAULT_TASK_TYPE', 'text_processing'),
+        debug_mode=os.environ.get('DEBUG', 'false').lower() == 'true'
+    )
+
+
+def reset_environment_config_cache() -> None:
+    """Drop the cached environment config so the next call re-reads os.environ"""
+    get_environment_config.cache_clear()
+
+
+def validate_file_size(content_base64: str, max_size_mb: int = 10, strict: bool = False) -> bool:
+    """
+    Validate that base64 encoded file is within size limits
+    
+    The decoded size is computed from the encoded length without decoding.
+    Pass strict=True to also verify that the payload actually decodes.
+    """
+    return validate_file_sizes([content_base64], max_size_mb, strict)[0]
+
+
+def validate_file_sizes(contents_base64: Iterable[str], max_size_mb: int = 10,
+                        strict: bool = False) -> List[bool]:
+    """Validate a batch of base64 encoded files against the same size limit"""
+    max_size_bytes = max_size_mb * 1024 * 1024
+    results = []
+    
+    for content_base64 in contents_base64:
+        if not isinstance(content_base64, str):
+            results.append(False)
+            continue
+        
+        # Drop all whitespace (line wrapping, spaces) in a single pass
+        encoded = content_base64.translate(_WHITESPACE_TABLE)
+        
+        if len(encoded) % 4:
+            results.append(False)
+            continue
+        
+        # Calculate actual file size from base64 length and padding
+        size_bytes = (len(encoded) // 4) * 3 - encoded.count('=', -2)
+        valid = size_bytes <= max_size_bytes
+        
+        if valid and strict:
+            try:
+                binascii.a2b_base64(encoded, strict_mode=True)
+            except binascii.Error:
+                valid = False
+        
+        results.append(valid)
+    
+    return results
 
 
-def validate_file_size(content_base64: str, max_size_mb: int = 10) -> bool:
-    """Validate that base64 encoded file is within size limits"""
-    try:
-        # Calculate actual file size from base64
-        content_bytes = base64.b64decode(content_base64)
-        size_mb = len(content_bytes) / (1024 * 1024)
-        return size_mb <= max_size_mb
-    except Exception:
-        return False
+def iter_decoded(content_base64: str, chunk_chars: int = 4096) -> Iterator[bytes]:
+    """
+    Decode base64 content incrementally, yielding one decoded block at a time
+    
+    Memory stays bounded by chunk_chars regardless of payload size; check the
+    size with validate_file_size first so oversize inputs are rejected early.
+    """
+    # Slices must stay aligned to 4-character base64 quanta
+    chunk_chars -= chunk_chars % 4
+    if chunk_chars <= 0:
+        raise ValueError("chunk_chars must be at least 4")
+    
+    # Drop all whitespace first so slices stay aligned to base64 quanta
+    encoded = content_base64.translate(_WHITESPACE_TABLE)
+    
+    for start in range(0, len(encoded), chunk_chars):
+        yield binascii.a2b_base64(encoded[start:start + chunk_chars])
 
 
 def format_duration(seconds: float) -> str:
     """Format duration in human-readable format"""
     if seconds < 60:
         return f"{seconds:.1f}s"
-    elif seconds < 3600:
-        minutes = seconds // 60
-        remaining_seconds = seconds % 60
-        return f"{int(minutes)}m {remaining_seconds:.1f}s"
-    else:
-        hours = seconds // 3600
-        remaining_minutes = (seconds % 3600) // 60
-        return f"{int(hours)}h {int(remaining_minutes)}m"
+    minutes, remaining_seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    if hours:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m {remaining_seconds:.1f}s"
 
 
-def generate_file_metadata(content: str, filename: str, content_type: str) -> Dict[str, Any]:
+def generate_file_metadata(content: Union[str, bytes, bytearray, memoryview],
+                           filename: str, content_type: str) -> Dict[str, Any]:
     """Generate comprehensive file metadata"""
-    content_bytes = content.encode() if isinstance(content, str) else content
+    hasher = hashlib.blake2b(digest_size=8)
+    
+    if isinstance(content, str):
+        # Encode and hash in slices so size and checksum come from one pass
+        # without materializing the full encoded text
+        size_bytes = 0
+        for start in range(0, len(content), _METADATA_CHUNK_CHARS):
+            chunk = content[start:start + _METADATA_CHUNK_CHARS].encode('utf-8')
+            hasher.update(chunk)
+            size_bytes += len(chunk)
+    else:
+        # Bytes-like content is viewed in place; strided views must be copied
+        # since the hasher only accepts contiguous buffers
+        content_view = memoryview(content)
+        hasher.update(content_view if content_view.c_contiguous else content_view.tobytes())
+        size_bytes = content_view.nbytes
     
     return {
         'filename': filename,
         'content_type': content_type,
-        'size_bytes': len(content_bytes),
-        'size_human': format_file_size(len(content_bytes)),
-        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
-        'checksum': hash(content_bytes) % (10**10)  # Simple hash for verification
+        'size_bytes': size_bytes,
+        'size_human': format_file_size(size_bytes),
+        'created_at': _timestamp(),
+        'checksum': hasher.hexdigest()  # Stable across runs
     }
 
 
 def format_file_size(size_bytes: int) -> str:
     """Format file size in human-readable format"""
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if size_bytes < 1024.0:
-            return f"{size_bytes:.1f} {unit}"
-        size_bytes /= 1024.0
-    return f"{size_bytes:.1f} TB"
+    if size_bytes < 1024:
+        return f"{size_bytes:.1f} B"
+    # Each unit is 2**10 of the previous one, so the bit length picks the unit
+    unit_index = min((int(size_bytes).bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+    return f"{size_bytes / (1 << (unit_index * 10)):.1f} {_SIZE_UNITS[unit_index]}"
 
 
 def sanitize_filename(filename: str) -> str:
     """Sanitize filename for safe storage"""
     # Remove or replace invalid characters
-    invalid_chars = '<>:"/\\|?*'
-    for char in invalid_chars:
-        filename = filename.replace(char, '_')
+    filename = filename.translate(_SANITIZE_TABLE)
     
     # Limit length
     if len(filename) > 255:
@@ -96,23 +216,33 @@ def sanitize_filename(filename: str) -> str:
 
 def create_error_response(error_type: str, message: str, task_id: Optional[str] = None) -> Dict[str, Any]:
     """Create standardized error response"""
-    return {
-        'success': False,
-        'error': error_type,
-        'message': message,
-        'task_id': task_id,
-        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
-    }
+    response = _ERROR_TEMPLATE.copy()
+    response['error'] = error_type
+    response['message'] = message
+    response['task_id'] = task_id
+    response['timestamp'] = _timestamp()
+    return response
 
 
 def create_success_response(data: Dict[str, Any], task_id: str) -> Dict[str, Any]:
     """Create standardized success response"""
-    return {
-        'success': True,
-        'task_id': task_id,
-        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
-        **data
-    }
+    response = _SUCCESS_TEMPLATE.copy()
+    response['task_id'] = task_id
+    response['timestamp'] = _timestamp()
+    response.update(data)
+    return response
+
+
+def _compute_progress(current_step: int, total_steps: int,
+                      elapsed_time: float) -> Tuple[int, Optional[float]]:
+    """Return (progress percent, estimated seconds remaining or None)"""
+    progress_percent = current_step * 100 // total_steps
+    
+    # Estimate remaining time based on average step duration
+    if current_step > 1:
+        avg_step_time = elapsed_time / current_step
+        return progress_percent, avg_step_time * (total_steps - current_step)
+    return progress_percent, None
 
 
 class ProgressTracker:
@@ -122,54 +252,48 @@ class ProgressTracker:
         self.task_id = task_id
         self.total_steps = total_steps
         self.current_step = 0
-        self.start_time = time.time()
-        self.step_times = []
+        self.start_time = time.monotonic()
+        
+        # Fields shared by every progress frame
+        self._base = {'task_id': task_id, 'status': 'processing', 'total_steps': total_steps}
     
     def next_step(self, step_name: str) -> Dict[str, Any]:
         """Advance to next step and return progress info"""
         self.current_step += 1
-        current_time = time.time()
-        self.step_times.append(current_time)
+        current_time = time.monotonic()
         
-        progress_percent = int((self.current_step / self.total_steps) * 100)
         elapsed_time = current_time - self.start_time
+        progress_percent, estimated_remaining = _compute_progress(
+            self.current_step, self.total_steps, elapsed_time
+        )
         
-        # Estimate remaining time based on average step duration
-        if len(self.step_times) > 1:
-            avg_step_time = elapsed_time / self.current_step
-            remaining_steps = self.total_steps - self.current_step
-            estimated_remaining = avg_step_time * remaining_steps
-        else:
-            estimated_remaining = None
-        
-        return {
-            'task_id': self.task_id,
-            'status': 'processing',
-            'progress': progress_percent,
-            'current_step': step_name,
-            'step': self.current_step,
-            'total_steps': self.total_steps,
-            'elapsed_time': elapsed_time,
-            'estimated_remaining': estimated_remaining,
-            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
-        }
+        frame = self._base.copy()
+        frame.update(
+            progress=progress_percent,
+            current_step=step_name,
+            step=self.current_step,
+            elapsed_time=elapsed_time,
+            estimated_remaining=estimated_remaining,
+            timestamp=_timestamp()
+        )
+        return frame
     
     def complete(self) -> Dict[str, Any]:
         """Mark processing as complete"""
-        total_time = time.time() - self.start_time
+        total_time = time.monotonic() - self.start_time
         return {
             'task_id': self.task_id,
             'status': 'completed',
             'progress': 100,
             'total_duration': total_time,
             'total_steps': self.total_steps,
-            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+            'timestamp': _timestamp()
         }
 
 
 # Constants for validation
-VALID_TASK_TYPES = ['text_processing', 'image_generation', 'data_analysis']
-VALID_OUTPUT_FORMATS = ['base64', 'url', 'json']
+VALID_TASK_TYPES = frozenset({'text_processing', 'image_generation', 'data_analysis'})
+VALID_OUTPUT_FORMATS = frozenset({'base64', 'url', 'json'})
 MAX_DURATION_SECONDS = 45
 MIN_DURATION_SECONDS = 5
 MAX_FILE_SIZE_MB = 50
\ No newline at end of file